@@ -1,29 +1,58 @@
 import os
+import random
 import time
+from functools import lru_cache
+from typing import Callable, Optional
 from instagrapi import Client
-from instagrapi.exceptions import TwoFactorRequired
+from instagrapi.types import UserShort
+from instagrapi.exceptions import ClientThrottledError, PleaseWaitFewMinutes, TwoFactorRequired
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RetryError
+from urllib3.util.retry import Retry
+
+
+# Folder where the TXT reports are saved, created once at import
+OUTPUT_DIR = "outputs"
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+# Authenticated client reused for the lifetime of the process
+_CLIENT: Optional[Client] = None
 
 
 def save_to_file(filename: str, usernames: list[str]) -> None:
     """
     Saves a list of Instagram usernames to a text file.
+    The file is replaced atomically once fully written.
 
     Args:
         filename (str): The file path to save the data.
         usernames (list[str]): The list of usernames to write.
     """
     # Ensure the directory exists
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    
-    # Write each username to a new line in the file
-    with open(filename, 'w') as f:
-        f.writelines(f"{user}\n" for user in usernames)
+    os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+
+    # Join all usernames once and write them in a single buffered call
+    data = "\n".join(usernames)
+    if data:
+        data += "\n"
+
+    # Write to a temp file first and swap it in, so a crash never leaves a truncated report
+    tmp_filename = filename + ".tmp"
+    try:
+        with open(tmp_filename, 'w', encoding="utf-8", buffering=1024 * 1024) as f:
+            f.write(data)
+    except BaseException:
+        os.remove(tmp_filename)                   # Don't leave a partial temp file behind
+        raise
+    os.replace(tmp_filename, filename)
 
 
+@lru_cache(maxsize=None)
 def get_env_variable(key: str) -> str:
     """
     Retrieves a required environment variable from the .env file.
+    Values are cached after the first successful lookup.
 
     Args:
         key (str): The name of the environment variable.
@@ -40,18 +69,46 @@ def get_env_variable(key: str) -> str:
     return value
 
 
+def configure_retries(cl: Client) -> None:
+    """
+    Keeps instagrapi's automatic retries for server errors but lets HTTP 429
+    responses through, so throttling surfaces as ClientThrottledError with
+    its Retry-After header instead of being retried blindly.
+
+    Args:
+        cl (Client): The instagrapi client to configure.
+    """
+    retry_strategy = Retry(
+        total=3,
+        status_forcelist=[500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],
+        backoff_factor=2,
+        respect_retry_after_header=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry_strategy)
+    cl.private.mount("https://", adapter)
+    cl.private.mount("http://", adapter)
+
+
 def login_with_env(session_file: str = "session.json") -> Client:
     """
     Logs into Instagram using credentials from the .env file,
     handling 2FA if required, and reusing session if available.
+    The authenticated client is cached and returned on later calls.
 
     Args:
-        session_file (str): Path to the saved session file.
+        session_file (str): Path to the saved session file. Only used by
+            the first call, later calls return the cached client as is.
 
     Returns:
         Client: Authenticated instagrapi client instance.
     """
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+
     cl = Client()
+    configure_retries(cl)
     username = get_env_variable("IG_USERNAME")
     password = get_env_variable("IG_PASSWORD")
 
@@ -62,6 +119,7 @@ def login_with_env(session_file: str = "session.json") -> Client:
             cl.login(username, password)          # Attempt login using session
             cl.get_timeline_feed()                # Test if session is still valid
             print("✅ Logged in using saved session")
+            _CLIENT = cl
             return cl
         except Exception as e:
             print("⚠️ Failed to reuse session:", e)
@@ -79,56 +137,132 @@ def login_with_env(session_file: str = "session.json") -> Client:
 
     # Save the session for future runs
     cl.dump_settings(session_file)
+    _CLIENT = cl
     return cl
 
 
-def compare_followers_and_following(cl: Client, username: str) -> None:
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Reads the Retry-After header from a throttling error's HTTP response.
+
+    Args:
+        error (Exception): The instagrapi exception raised for the request.
+
+    Returns:
+        float | None: Seconds to wait, or None if the header is missing
+            or not a number of seconds.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def collect_usernames(
+    fetch_chunk: Callable[..., tuple[list[UserShort], str]],
+    user_id: str,
+    chunk_size: int = 200,
+    max_retries: int = 6,
+    base_delay: float = 15,
+) -> set[str]:
+    """
+    Pages through a followers/following chunk endpoint and keeps only
+    the usernames, so full user objects never pile up in memory.
+    When Instagram throttles a request, backs off (honoring Retry-After)
+    and retries the same page instead of discarding the progress made so far.
+
+    Args:
+        fetch_chunk (Callable): A chunked client method such as
+            `cl.user_followers_v1_chunk`.
+        user_id (str): The Instagram user ID whose list to fetch.
+        chunk_size (int): Number of users to request per page.
+        max_retries (int): Throttled attempts allowed per page before giving up.
+        base_delay (float): First back-off in seconds, doubled on each retry
+            up to 240s.
+
+    Returns:
+        set[str]: The usernames returned by the endpoint.
+
+    Raises:
+        PleaseWaitFewMinutes, ClientThrottledError, RetryError: If a page
+            still fails after `max_retries` retries.
+    """
+    usernames = set()
+    cursor = ""
+    attempt = 0
+    while True:
+        try:
+            users, next_cursor = fetch_chunk(user_id, max_amount=chunk_size, max_id=cursor)
+        except (PleaseWaitFewMinutes, ClientThrottledError, RetryError) as e:
+            attempt += 1
+            if attempt > max_retries:
+                raise
+            delay = min(240, base_delay * 2 ** (attempt - 1))
+            delay = max(delay, retry_after_seconds(e) or 0) + random.uniform(0, 5)
+            print(f"⏳ Rate limited ({e}), retrying in {delay:.0f}s...")
+            time.sleep(delay)
+            continue
+
+        attempt = 0
+        cursor = next_cursor
+        usernames.update(user.username for user in users)
+        if not cursor:
+            return usernames
+
+
+def compare_followers_and_following(
+    cl: Client,
+    username: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> None:
     """
     Compares your followers and following lists and saves usernames to CSV files.
 
     Args:
         cl (Client): Authenticated instagrapi client.
-        username (str): Your Instagram username.
+        username (str, optional): Your Instagram username, used to look up
+            the user ID when `user_id` is not given.
+        user_id (str, optional): Your internal Instagram user ID. Skips the
+            username lookup request when provided.
     """
-    # Get the internal Instagram user ID
-    user_id = cl.user_id_from_username(username)
+    # Get the internal Instagram user ID only if the caller didn't supply it
+    if user_id is None:
+        if username is None:
+            raise ValueError("Either username or user_id must be provided")
+        user_id = cl.user_id_from_username(username)
 
     print("📥 Fetching followers...")
-    followers = cl.user_followers(user_id)
+    followers_set = collect_usernames(cl.user_followers_v1_chunk, user_id)
     time.sleep(3)  # Pause to mimic human behavior
 
     print("📤 Fetching following...")
-    following = cl.user_following(user_id)
-    time.sleep(3)  # Pause to mimic human behavior
-
-    # Extract just the usernames from user objects
-    followers_usernames = sorted({user.username for user in followers.values()})
-    following_usernames = sorted({user.username for user in following.values()})
+    following_set = collect_usernames(cl.user_following_v1_chunk, user_id)
 
     # Determine who you follow that doesn’t follow you back
-    not_following_back = sorted(set(following_usernames) - set(followers_usernames))
+    not_following_back = sorted(following_set - followers_set)
 
     # Determine who follows you but you don’t follow back
-    not_followed_back = sorted(set(followers_usernames) - set(following_usernames))
-
-    # Make sure the output folder exists
-    os.makedirs("outputs", exist_ok=True)
+    not_followed_back = sorted(followers_set - following_set)
 
     # Save the results as .txt files
-    with open("outputs/not_following_back.txt", "w") as f:
-        f.writelines(f"{username}\n" for username in not_following_back)
-
-    with open("outputs/fans.txt", "w") as f:
-        f.writelines(f"{username}\n" for username in not_followed_back)
+    not_following_back_file = os.path.join(OUTPUT_DIR, "not_following_back.txt")
+    fans_file = os.path.join(OUTPUT_DIR, "fans.txt")
+    save_to_file(not_following_back_file, not_following_back)
+    save_to_file(fans_file, not_followed_back)
 
     print("✅ TXT files saved:")
-    print(f"   • {len(not_following_back)} not following you back → outputs/not_following_back.txt")
-    print(f"   • {len(not_followed_back)} you’re not following back → outputs/fans.txt")
+    print(f"   • {len(not_following_back)} not following you back → {not_following_back_file}")
+    print(f"   • {len(not_followed_back)} you’re not following back → {fans_file}")
 
 
 # Entry point of the script
 if __name__ == "__main__":
-    load_dotenv()  # Load credentials from .env file
+    # Only parse .env if the credentials aren't already in the environment
+    if not all(os.environ.get(key) for key in ("IG_USERNAME", "IG_PASSWORD")):
+        load_dotenv()  # Load credentials from .env file
     client = login_with_env()
-    username = get_env_variable("IG_USERNAME")
-    compare_followers_and_following(client, username)
+    # The logged-in client already knows our user ID, no lookup needed
+    compare_followers_and_following(client, user_id=str(client.user_id))
@@ -0,0 +1,87 @@
+import importlib
+from types import SimpleNamespace
+
+import pytest
+import requests
+from instagrapi.exceptions import ClientThrottledError, PleaseWaitFewMinutes
+from requests.exceptions import RetryError
+
+
+@pytest.fixture
+def checker(tmp_path, monkeypatch):
+    # Importing the script creates the outputs folder in the working directory
+    monkeypatch.chdir(tmp_path)
+    module = importlib.import_module("instagram_follow_checker")
+    sleeps = []
+    monkeypatch.setattr(module.time, "sleep", sleeps.append)
+    monkeypatch.setattr(module.random, "uniform", lambda a, b: 0)
+    return module, sleeps
+
+
+def throttled_response(headers=None):
+    response = requests.Response()
+    response.status_code = 429
+    response.headers.update(headers or {})
+    return response
+
+
+def make_fetch_chunk(error):
+    """Returns a two-page fetch_chunk stub that raises `error` once on the second page."""
+    calls = []
+
+    def fetch_chunk(user_id, max_amount, max_id):
+        calls.append(max_id)
+        if max_id == "page2" and calls.count("page2") == 1:
+            raise error
+        if max_id == "":
+            return [SimpleNamespace(username="alice")], "page2"
+        return [SimpleNamespace(username="bob")], ""
+
+    return fetch_chunk, calls
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        PleaseWaitFewMinutes("Please wait a few minutes"),
+        ClientThrottledError("429", response=throttled_response()),
+        RetryError("too many 500 error responses"),
+    ],
+)
+def test_throttled_page_is_retried_from_same_cursor(checker, error):
+    module, sleeps = checker
+    fetch_chunk, calls = make_fetch_chunk(error)
+
+    assert module.collect_usernames(fetch_chunk, "1") == {"alice", "bob"}
+    assert calls == ["", "page2", "page2"]
+    assert sleeps == [15]
+
+
+def test_retry_after_header_is_honored(checker):
+    module, sleeps = checker
+    error = ClientThrottledError("429", response=throttled_response({"Retry-After": "100"}))
+    fetch_chunk, _ = make_fetch_chunk(error)
+
+    module.collect_usernames(fetch_chunk, "1")
+    assert sleeps == [100]
+
+
+def test_gives_up_after_max_retries(checker):
+    module, sleeps = checker
+
+    def fetch_chunk(user_id, max_amount, max_id):
+        raise PleaseWaitFewMinutes("Please wait a few minutes")
+
+    with pytest.raises(PleaseWaitFewMinutes):
+        module.collect_usernames(fetch_chunk, "1")
+    assert sleeps == [15, 30, 60, 120, 240, 240]
+
+
+def test_client_lets_429_through_to_instagrapi(checker):
+    module, _ = checker
+    cl = module.Client()
+    module.configure_retries(cl)
+
+    retries = cl.private.get_adapter("https://").max_retries
+    assert 429 not in retries.status_forcelist
+    assert not retries.respect_retry_after_header